@@ -1,7 +1,159 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heapify, heappop, heappush
+from time import time
+
+import numpy as np
 from ortools.sat.python import cp_model
+from psutil import cpu_count
+
+CP_MAX_NODES = 75
+CLIQUE_TIME_LIMIT = 5
+# the clique tabu search gives up after this many iterations per vertex without a larger clique
+CLIQUE_STALL_ITERATIONS = 10
+TABUCOL_TIME_LIMIT = 120
+HEA_MIN_NODES = 250
+HEA_TIME_LIMIT = 300
+HEA_POPULATION = 10
+HEA_TABU_ITERATIONS = 2000
+HEA_EPOCH = 10
+
+
+class Graph:
+    # Undirected graph stored twice, compactly: CSR arrays (the neighbors of v are
+    # indices[indptr[v]:indptr[v + 1]]) for walking neighborhoods, and a packed-bit
+    # adjacency matrix (bit v of row u, in np.packbits order) for set operations.
+
+    def __init__(self, node_count, edges):
+        # drop duplicate and reversed edges through one sorted key per edge
+        edges = np.sort(np.asarray(edges, dtype=np.int64).reshape(-1, 2), axis=1)
+        keys = np.sort(edges[:, 0] * node_count + edges[:, 1])
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        keys = keys[first]
+        edges = np.stack((keys // node_count, keys % node_count), axis=1)
+        self.node_count = node_count
+        self.edges = edges
+        heads = np.concatenate((edges[:, 0], edges[:, 1]))
+        tails = np.concatenate((edges[:, 1], edges[:, 0]))
+        order = np.argsort(heads, kind='stable')
+        self.indices = tails[order].astype(np.int32)
+        self.indptr = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(heads, minlength=node_count), out=self.indptr[1:])
+        # edges are unique, so every bit is set once and summing the bit values per byte ORs them
+        row_bytes = (node_count + 7) // 8
+        self.bits = np.bincount(heads * row_bytes + (tails >> 3), weights=128 >> (tails & 7),
+                                minlength=node_count * row_bytes).astype(np.uint8).reshape(node_count, row_bytes)
+
+    def __len__(self):
+        return self.node_count
+
+    def __getitem__(self, vertex):
+        return self.indices[self.indptr[vertex]:self.indptr[vertex + 1]].tolist()
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def neighbor_mask(self, vertex):
+        # boolean row of the adjacency matrix
+        return np.unpackbits(self.bits[vertex], count=self.node_count).view(bool)
+
+    def pack(self, vertices):
+        # packed bitset of a vertex set, comparable with the rows of self.bits
+        mask = np.zeros(self.node_count, dtype=bool)
+        mask[vertices] = True
+        return np.packbits(mask)
+
+    def neighbor_color_counts(self, colors, color_count):
+        # counts[v, c] is the number of neighbors of v that have color c
+        colors = np.asarray(colors)
+        counts = np.zeros((self.node_count, color_count), dtype=np.int32)
+        np.add.at(counts, (np.repeat(np.arange(self.node_count), self.degrees()), colors[self.indices]), 1)
+        return counts
+
+    def subgraph(self, vertices):
+        # the graph induced by vertices, which are relabelled 0, 1, ... in the given order
+        index = np.full(self.node_count, -1)
+        index[vertices] = np.arange(len(vertices))
+        edges = index[self.edges]
+        return Graph(len(vertices), edges[(edges >= 0).all(axis=1)])
+
+    def conflicts(self, colors):
+        # number of edges whose endpoints share a color
+        colors = np.asarray(colors)
+        return int(np.count_nonzero(colors[self.edges[:, 0]] == colors[self.edges[:, 1]]))
+
+
+Reduction = namedtuple("Reduction", ['core', 'vertices', 'removed'])
+
+
+def reduce_graph(graph, color_count):
+    # Removes, until neither applies, vertices of degree < color_count (a coloring with at
+    # least color_count colors always leaves one free for them) and vertices u whose
+    # neighborhood is contained in that of a non-adjacent vertex v (u can take the color of v).
+    # core is the graph induced by the remaining vertices, and removed lists the (vertex,
+    # dominating vertex or -1) pairs in the order they were taken out.
+    alive = np.ones(graph.node_count, dtype=bool)
+    bits = graph.bits.copy()
+    degree = graph.degrees().copy()
+    removed = []
+
+    def remove(vertex, dominator):
+        alive[vertex] = False
+        removed.append((int(vertex), int(dominator)))
+        bits[:, vertex >> 3] &= np.uint8(~(128 >> (vertex & 7)) & 255)
+        degree[graph.indices[graph.indptr[vertex]:graph.indptr[vertex + 1]]] -= 1
+
+    changed = True
+    while changed:
+        changed = False
+        stack = np.flatnonzero(alive & (degree < color_count)).tolist()
+        while stack:
+            vertex = stack.pop()
+            if not alive[vertex]:
+                continue
+            remove(vertex, -1)
+            changed = True
+            stack.extend(u for u in graph[vertex] if alive[u] and degree[u] < color_count)
+
+        for vertex in np.flatnonzero(alive):
+            if not alive[vertex]:
+                continue
+            rest = np.flatnonzero(alive)
+            dominators = ~np.any(bits[vertex] & ~bits[rest], axis=1)
+            dominators &= ~graph.neighbor_mask(vertex)[rest]
+            dominators &= rest != vertex
+            if dominators.any():
+                remove(vertex, rest[np.argmax(dominators)])
+                changed = True
+
+    vertices = np.flatnonzero(alive)
+    return Reduction(graph.subgraph(vertices), vertices, removed)
+
+
+def expand_colors(graph, reduction, core_colors):
+    # puts the removed vertices back in reverse order: dominated vertices copy the color of
+    # their dominator, the others take the smallest color free among their neighbors
+    colors = np.full(graph.node_count, -1)
+    colors[reduction.vertices] = core_colors
+    for vertex, dominator in reversed(reduction.removed):
+        if dominator >= 0:
+            colors[vertex] = colors[dominator]
+        else:
+            used = colors[graph.indices[graph.indptr[vertex]:graph.indptr[vertex + 1]]]
+            free = np.ones(len(used) + 1, dtype=bool)
+            free[used[(used >= 0) & (used < len(free))]] = False
+            colors[vertex] = np.argmax(free)
+    return colors.tolist()
+
+
+def parse(input_data):
+    data = np.array(list(map(int, input_data.split())), dtype=np.int64)
+    node_count, edge_count = int(data[0]), int(data[1])
+    return Graph(node_count, data[2:2 + 2 * edge_count])
+
 
 def greedy_coloring(graph, node_count):
     result = [-1] * node_count
@@ -34,11 +186,13 @@ def welsh_powell(graph, node_count):
     for node in sorted_nodes:
         if color_assignment[node] == -1:
             color_assignment[node] = current_color
+            color_class = graph.pack([node])
             for neighbor in sorted_nodes:
                 if neighbor != node and color_assignment[neighbor] == -1:
                     # Check if the neighbor can be colored with the current color
-                    if all(color_assignment[adj] != current_color for adj in graph[neighbor]):
+                    if not np.any(graph.bits[neighbor] & color_class):
                         color_assignment[neighbor] = current_color
+                        color_class[neighbor >> 3] |= 128 >> (neighbor & 7)
             current_color += 1
 
     return color_assignment
@@ -48,35 +202,292 @@ def dsatur(graph, node_count):
     color_assignment = [-1] * node_count
     degree = [len(graph[node]) for node in range(node_count)]
     saturation_degree = [0] * node_count
+    # bit c of neighbor_colors[v] is set once a neighbor of v has color c
+    neighbor_colors = [0] * node_count
 
-    def max_saturation_vertex():
-        max_saturation = -1
-        max_degree = -1
-        selected_vertex = -1
-        for vertex in range(node_count):
-            if color_assignment[vertex] == -1:
-                if (saturation_degree[vertex] > max_saturation or
-                    (saturation_degree[vertex] == max_saturation and degree[vertex] > max_degree)):
-                    max_saturation = saturation_degree[vertex]
-                    max_degree = degree[vertex]
-                    selected_vertex = vertex
-        return selected_vertex
+    # buckets[s] is a heap of (-degree, vertex) for the uncolored vertices of saturation s;
+    # a vertex moves to a higher bucket when its saturation grows and the stale entry is skipped
+    buckets = [[] for _ in range(node_count + 1)]
+    buckets[0] = [(-degree[vertex], vertex) for vertex in range(node_count)]
+    heapify(buckets[0])
+    max_saturation = 0
 
     for _ in range(node_count):
-        vertex = max_saturation_vertex()
-        neighbor_colors = {color_assignment[neighbor] for neighbor in graph[vertex] if color_assignment[neighbor] != -1}
-        color = 0
-        while color in neighbor_colors:
-            color += 1
+        while True:
+            bucket = buckets[max_saturation]
+            if not bucket:
+                max_saturation -= 1
+                continue
+            _, vertex = heappop(bucket)
+            if color_assignment[vertex] == -1 and saturation_degree[vertex] == max_saturation:
+                break
+
+        # lowest color not used by a neighbor is the lowest zero bit
+        mask = neighbor_colors[vertex]
+        color = (~mask & (mask + 1)).bit_length() - 1
         color_assignment[vertex] = color
+        bit = 1 << color
         for neighbor in graph[vertex]:
-            if color_assignment[neighbor] == -1:
-                unique_neighbor_colors = {color_assignment[adj] for adj in graph[neighbor] if color_assignment[adj] != -1}
-                saturation_degree[neighbor] = len(unique_neighbor_colors)
+            if color_assignment[neighbor] == -1 and not neighbor_colors[neighbor] & bit:
+                neighbor_colors[neighbor] |= bit
+                saturation_degree[neighbor] += 1
+                heappush(buckets[saturation_degree[neighbor]], (-degree[neighbor], neighbor))
+                max_saturation = max(max_saturation, saturation_degree[neighbor])
 
     return color_assignment
 
 
+def greedy_clique(graph, vertex, rng):
+    # grows a clique from vertex, each time adding the candidate adjacent to most other candidates
+    clique = [vertex]
+    candidates = graph.bits[vertex].copy()
+    while candidates.any():
+        vertices = np.flatnonzero(np.unpackbits(candidates, count=graph.node_count))
+        counts = np.unpackbits(graph.bits[vertices] & candidates, axis=1).sum(axis=1)
+        best = np.flatnonzero(counts == counts.max())
+        vertex = vertices[best[rng.integers(len(best))]]
+        clique.append(int(vertex))
+        candidates &= graph.bits[vertex]
+    return clique
+
+
+def max_clique(graph, time_limit=CLIQUE_TIME_LIMIT, upper_bound=None, seed=None):
+    # A large clique, found by greedy starts from the highest degree vertices and then a tabu
+    # search of add and swap moves. Its size is a lower bound on the number of colors, and
+    # the search stops early once it reaches upper_bound or stalls.
+    rng = np.random.default_rng(seed)
+    start = time()
+    node_count = graph.node_count
+    if node_count == 0:
+        return []
+    upper_bound = upper_bound or node_count
+    order = np.argsort(-graph.degrees(), kind='stable')
+
+    best = []
+    for vertex in order[:min(node_count, 20)]:
+        clique = greedy_clique(graph, int(vertex), rng)
+        if len(clique) > len(best):
+            best = clique
+        if len(best) >= upper_bound or time() - start >= time_limit:
+            return best
+
+    # missing[v] is the number of clique vertices that v is not adjacent to
+    in_clique = np.zeros(node_count, dtype=bool)
+    missing = np.zeros(node_count, dtype=np.int64)
+    tabu = np.zeros(node_count, dtype=np.int64)
+
+    def add(vertex):
+        in_clique[vertex] = True
+        missing[:] += ~graph.neighbor_mask(vertex)
+
+    def remove(vertex):
+        in_clique[vertex] = False
+        missing[:] -= ~graph.neighbor_mask(vertex)
+
+    for vertex in best:
+        add(vertex)
+    iteration = improved = 0
+    max_stall = CLIQUE_STALL_ITERATIONS * node_count
+    while len(best) < upper_bound and iteration - improved < max_stall and time() - start < time_limit:
+        allowed = ~in_clique & (tabu <= iteration)
+        additions = np.flatnonzero(allowed & (missing == 0))
+        swaps = np.flatnonzero(allowed & (missing == 1))
+        if len(additions):
+            add(additions[rng.integers(len(additions))])
+        elif len(swaps):
+            vertex = swaps[rng.integers(len(swaps))]
+            out = np.flatnonzero(in_clique & ~graph.neighbor_mask(vertex))[0]
+            remove(out)
+            add(vertex)
+            tabu[out] = iteration + 7 + rng.integers(len(swaps) + 1)
+        else:
+            # stuck on a plateau: restart from a random vertex
+            for vertex in np.flatnonzero(in_clique):
+                remove(vertex)
+            tabu[:] = 0
+            add(rng.integers(node_count))
+        iteration += 1
+        if np.count_nonzero(in_clique) > len(best):
+            best = np.flatnonzero(in_clique).tolist()
+            improved = iteration
+    return best
+
+
+def tabucol(graph, colors, color_count, max_iterations=None, time_limit=None, seed=None):
+    # Tabu search over color_count-colorings that minimizes the number of conflicting edges.
+    # gamma[v, c] counts the neighbors of v with color c, so moving v from colors[v] to c
+    # changes the conflicts by gamma[v, c] - gamma[v, colors[v]]. Returns the best coloring
+    # seen and its number of conflicts.
+    rng = np.random.default_rng(seed)
+    start = time()
+    rows = np.arange(graph.node_count)
+    colors = np.array(colors)
+    gamma = graph.neighbor_color_counts(colors, color_count)
+    tabu = np.zeros((graph.node_count, color_count), dtype=np.int64)
+    conflicts = graph.conflicts(colors)
+    best, best_colors = conflicts, colors.copy()
+
+    iteration = 0
+    while best > 0:
+        if max_iterations is not None and iteration >= max_iterations:
+            break
+        if time_limit is not None and time() - start >= time_limit:
+            break
+
+        # only vertices in a conflict are worth moving
+        own = gamma[rows, colors]
+        conflicting = np.flatnonzero(own)
+        delta = gamma[conflicting] - own[conflicting, None]
+        # tabu moves are allowed only if they reach a new best (aspiration)
+        allowed = (tabu[conflicting] <= iteration) | (conflicts + delta < best)
+        allowed[np.arange(len(conflicting)), colors[conflicting]] = False
+        if not allowed.any():
+            iteration += 1
+            continue
+        delta = np.where(allowed, delta, np.iinfo(delta.dtype).max)
+        moves = np.flatnonzero(delta == delta.min())
+        move = moves[rng.integers(len(moves))]
+        vertex, color = conflicting[move // color_count], move % color_count
+
+        old = colors[vertex]
+        conflicts += int(delta.flat[move])
+        colors[vertex] = color
+        neighbors = graph.indices[graph.indptr[vertex]:graph.indptr[vertex + 1]]
+        gamma[neighbors, old] -= 1
+        gamma[neighbors, color] += 1
+        # the tenure grows with the number of conflicting vertices
+        tabu[vertex, old] = iteration + rng.integers(10) + int(0.6 * len(conflicting)) + 1
+
+        iteration += 1
+        if conflicts < best:
+            best, best_colors = conflicts, colors.copy()
+
+    return best_colors, best
+
+
+def drop_color(graph, colors, color_count):
+    # moves the vertices of the last color to their least conflicting remaining color
+    colors = np.array(colors)
+    dropped = np.flatnonzero(colors == color_count)
+    gamma = graph.neighbor_color_counts(colors, color_count + 1)[:, :color_count]
+    for vertex in dropped:
+        color = int(np.argmin(gamma[vertex]))
+        colors[vertex] = color
+        neighbors = graph.indices[graph.indptr[vertex]:graph.indptr[vertex + 1]]
+        gamma[neighbors, color] += 1
+    return colors
+
+
+def tabucol_search(graph, colors, time_limit=TABUCOL_TIME_LIMIT, lower_bound=1, seed=None):
+    # starting from a valid coloring with k colors, look for one with k - 1 and repeat
+    # until tabucol fails within the remaining time or k reaches the lower bound
+    start = time()
+    colors = np.array(colors)
+    while colors.max() + 1 > lower_bound:
+        remaining = time_limit - (time() - start)
+        if remaining <= 0:
+            break
+        color_count = int(colors.max())
+        found, conflicts = tabucol(graph, drop_color(graph, colors, color_count), color_count,
+                                   time_limit=remaining, seed=seed)
+        if conflicts:
+            break
+        # tabucol may have emptied more colors on the way
+        colors = np.unique(found, return_inverse=True)[1]
+    return colors.tolist()
+
+
+def gpx(parent_a, parent_b, color_count, rng):
+    # greedy partition crossover: the child takes the largest remaining color class of each
+    # parent in turn, and the vertices left over at the end get random colors
+    child = np.full(len(parent_a), -1)
+    parents = (parent_a, parent_b)
+    for color in range(color_count):
+        free = np.flatnonzero(child == -1)
+        if not len(free):
+            break
+        parent = parents[color % 2]
+        largest = np.argmax(np.bincount(parent[free], minlength=color_count))
+        child[free[parent[free] == largest]] = color
+    free = child == -1
+    child[free] = rng.integers(color_count, size=np.count_nonzero(free))
+    return child
+
+
+def evolve(graph, population, color_count, time_limit, seed=None, tabu_iterations=HEA_TABU_ITERATIONS):
+    # Hybrid evolutionary search: children of random pairs are improved by tabucol and replace
+    # the worse parent. The population is a list of (colors, conflicts); individuals with
+    # conflicts None have not been improved yet.
+    rng = np.random.default_rng(seed)
+    start = time()
+
+    def improve(colors):
+        remaining = max(time_limit - (time() - start), 0)
+        return tabucol(graph, colors, color_count, max_iterations=tabu_iterations,
+                       time_limit=remaining, seed=rng.integers(2 ** 32))
+
+    population = [improve(colors) if conflicts is None else (colors, conflicts) for colors, conflicts in population]
+    while time() - start < time_limit and min(conflicts for _, conflicts in population) > 0:
+        i, j = rng.choice(len(population), 2, replace=False)
+        child = improve(gpx(population[i][0], population[j][0], color_count, rng))
+        worse = i if population[i][1] >= population[j][1] else j
+        if child[1] <= population[worse][1]:
+            population[worse] = child
+    return population
+
+
+def _init_island(node_count, edges):
+    global _island_graph
+    _island_graph = Graph(node_count, edges)
+
+
+def _evolve_island(population, color_count, time_limit, seed):
+    return evolve(_island_graph, population, color_count, time_limit, seed)
+
+
+def hea_search(graph, colors, time_limit=HEA_TIME_LIMIT, islands=None, epoch=HEA_EPOCH, lower_bound=1, seed=None):
+    # Like tabucol_search, but every color count is attacked by evolve running on a ring of
+    # islands in separate processes. After each epoch the best individual of every island
+    # replaces the worst of the next one.
+    start = time()
+    rng = np.random.default_rng(seed)
+    islands = islands or cpu_count()
+    colors = np.array(colors)
+    with ProcessPoolExecutor(islands, initializer=_init_island, initargs=(graph.node_count, graph.edges)) as executor:
+        while colors.max() + 1 > lower_bound and time() - start < time_limit:
+            color_count = int(colors.max())
+            base = drop_color(graph, colors, color_count)
+            populations = []
+            for _ in range(islands):
+                population = []
+                for _ in range(HEA_POPULATION):
+                    # perturb a fifth of the vertices so that individuals differ
+                    individual = base.copy()
+                    moved = rng.random(graph.node_count) < 0.2
+                    individual[moved] = rng.integers(color_count, size=np.count_nonzero(moved))
+                    population.append((individual, None))
+                populations.append(population)
+
+            found = None
+            while found is None and time() - start < time_limit:
+                remaining = min(epoch, time_limit - (time() - start))
+                futures = [executor.submit(_evolve_island, population, color_count, remaining, rng.integers(2 ** 32))
+                           for population in populations]
+                populations = [future.result() for future in futures]
+                bests = [min(population, key=lambda individual: individual[1]) for population in populations]
+                for individual, conflicts in bests:
+                    if conflicts == 0:
+                        found = individual
+                for island, population in enumerate(populations):
+                    migrant = bests[island - 1]
+                    worst = max(range(len(population)), key=lambda i: population[i][1])
+                    population[worst] = migrant
+            if found is None:
+                break
+            colors = np.unique(found, return_inverse=True)[1]
+    return colors.tolist()
+
+
 from docplex.mp.model import Model
 def solve_model(graph, node_count):
     model = Model(name="Graph Coloring")
@@ -106,89 +517,165 @@ def solve_model(graph, node_count):
     num_colors_used = sum(solution[y[j]] for j in range(n))
     return num_colors_used, colors
 
-from ortools.sat.python import cp_model
-def or_solver(node_count, edges):
+def or_solver(graph):
     solved = False
     max_color = 1
 
     while not solved:
         max_color += 1
         model = cp_model.CpModel()
-        variables = [model.NewIntVar(0, max_color-1, f'x{i}') for i in range(node_count)]
-        for edge in edges:
+        variables = [model.NewIntVar(0, max_color-1, f'x{i}') for i in range(graph.node_count)]
+        for edge in graph.edges.tolist():
             model.Add(variables[edge[0]] != variables[edge[1]])
 
         solver = cp_model.CpSolver()
         solver.parameters.max_time_in_seconds = 30.0
         status = solver.Solve(model)
 
-        if status == cp_model.FEASIBLE:
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
             solved = True
             solution = [solver.Value(var) for var in variables]
 
     return max_color, solution
 
 
-def improve_with_or_solver(items, node_count, target, time_limit=10):
-    model = cp_model.CpModel()
-    colors = [
-        model.NewIntVar(0, node_count - 1, 'c%i' % i) for i in range(node_count)
-    ]
-    max_color = model.NewIntVar(0, node_count - 1 ,'obj')
+class ColoringModel:
+    # One CP-SAT model kept across targets: solving for fewer colors only tightens the upper
+    # bound of max_color in place, and the previous coloring is passed as a hint. The vertices
+    # of a clique (vertex 0 if none is given) are fixed to the first colors, which breaks the
+    # symmetry between colors.
+
+    def __init__(self, graph, clique=(), workers=None):
+        node_count = graph.node_count
+        self.workers = workers or cpu_count()
+        self.model = cp_model.CpModel()
+        self.colors = [
+            self.model.NewIntVar(0, node_count - 1, 'c%i' % i) for i in range(node_count)
+        ]
+        self.max_color = self.model.NewIntVar(0, node_count - 1, 'obj')
+
+        for u, v in graph.edges.tolist():
+            self.model.Add(self.colors[u] != self.colors[v])
+
+        self.model.AddMaxEquality(self.max_color, self.colors)
+
+        self.clique = list(clique) if len(clique) else list(range(min(node_count, 1)))
+        for color, vertex in enumerate(self.clique):
+            self.model.Add(self.colors[vertex] == color)
+
+    def solve(self, target, hint=None, time_limit=10):
+        # Looks for a coloring with max_color <= target, i.e. at most target + 1 colors.
+        # Returns the solver status and the coloring, which is None unless one was found;
+        # INFEASIBLE proves that target + 1 colors are not enough.
+        self.model.Proto().variables[self.max_color.Index()].domain[1] = target
+        self.model.ClearHints()
+        if hint is not None:
+            # rename the hint's colors so that it agrees with the colors fixed on the clique
+            labels = {int(hint[vertex]): color for color, vertex in enumerate(self.clique)}
+            for value in hint:
+                labels.setdefault(int(value), len(labels))
+            for color, value in zip(self.colors, hint):
+                self.model.AddHint(color, labels[int(value)])
 
-    for u,v in items:
-        model.Add(colors[u] != colors[v])
-
-    model.AddMaxEquality(max_color, colors)
-
-    model.Add(colors[0] == 0)
-    for i in range(node_count):
-        model.Add(colors[i] <= i+1)
-
-    model.Add(max_color <= target)
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = time_limit
+        solver.parameters.num_search_workers = self.workers
+        status = solver.Solve(self.model)
 
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = time_limit
-    solver.Solve(model)
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return status, None
+        return status, [solver.Value(color) for color in self.colors]
 
-    try:
-        results = [solver.Value(colors[i]) for i in range(node_count)]
-    except IndexError:
-        results = None
 
-    return results
+def components(graph):
+    # vertex arrays of the connected components, by union-find over the edge list
+    parent = list(range(graph.node_count))
 
+    def find(vertex):
+        while parent[vertex] != vertex:
+            parent[vertex] = parent[parent[vertex]]
+            vertex = parent[vertex]
+        return vertex
 
-def solve_it(input_data):
-    lines = input_data.split('\n')
+    for u, v in graph.edges.tolist():
+        root_u, root_v = find(u), find(v)
+        if root_u != root_v:
+            parent[root_u] = root_v
 
-    first_line = lines[0].split()
-    node_count = int(first_line[0])
-    edge_count = int(first_line[1])
+    roots = np.array([find(vertex) for vertex in range(graph.node_count)], dtype=np.int64)
+    order = np.argsort(roots, kind='stable')
+    cuts = np.flatnonzero(np.diff(roots[order])) + 1
+    return np.split(order, cuts) if graph.node_count else []
 
-    graph = [[] for _ in range(node_count)]
-    items = []
-    for i in range(1, edge_count + 1):
-        line = lines[i]
-        parts = line.split()
-        graph[int(parts[0])].append(int(parts[1]))
-        graph[int(parts[1])].append(int(parts[0]))
-        items.append(list(map(int, parts)))
 
+def solve_graph(graph, cores=None):
+    # colors a connected graph on the given number of cores (all by default), returning the
+    # coloring and its lower bound
+    node_count = graph.node_count
     colors = dsatur(graph, node_count)
+    # a clique needs as many colors as it has vertices, so reaching its size proves optimality
+    clique = max_clique(graph, upper_bound=max(colors) + 1)
+    lower_bound = len(clique)
+
+    if max(colors) + 1 > lower_bound:
+        # any coloring of the core with at least lower_bound colors extends to the whole graph
+        # without new colors, so the searches below only see the core
+        reduction = reduce_graph(graph, lower_bound)
+        core = reduction.core
+        core_count = core.node_count
+        core_colors = dsatur(core, core_count) if core_count else []
+
+        if core_count > CP_MAX_NODES:
+            core_colors = tabucol_search(core, core_colors, lower_bound=lower_bound)
+        if core_count >= HEA_MIN_NODES:
+            core_colors = hea_search(core, core_colors, islands=cores, lower_bound=lower_bound)
+
+        if 0 < core_count <= CP_MAX_NODES:
+            # what is left of the clique in the core still breaks the color symmetry
+            position = np.full(node_count, -1)
+            position[reduction.vertices] = np.arange(core_count)
+            core_clique = [int(position[vertex]) for vertex in clique if position[vertex] >= 0]
+            model = ColoringModel(core, core_clique, workers=cores)
+            while max(core_colors) + 1 > lower_bound:
+                status, new_colors = model.solve(max(core_colors) - 1, hint=core_colors, time_limit=300)
+                if status == cp_model.INFEASIBLE:
+                    # the core is a subgraph, so the whole graph needs at least as many colors
+                    lower_bound = max(core_colors) + 1
+                if new_colors is None:
+                    break
+                core_colors = new_colors
+
+        expanded = expand_colors(graph, reduction, core_colors)
+        if max(expanded) < max(colors):
+            colors = expanded
+
+    return colors, lower_bound
 
-    if node_count <= 75:
-        target = max(colors)
-        while True:
-            new_colors = improve_with_or_solver(items, node_count, target, time_limit=300)
-            if new_colors is not None:
-                colors = new_colors
-                target -= 1
-            else:
-                break
+
+def solve_it(input_data):
+    graph = parse(input_data)
+    node_count = graph.node_count
+
+    # components are independent: each is colored on its own, in parallel and with an equal
+    # share of the cores when there are several, and isolated vertices all get color 0
+    colors = np.zeros(node_count, dtype=np.int64)
+    lower_bound = 1 if node_count else 0
+    parts = [vertices for vertices in components(graph) if len(vertices) > 1]
+    subgraphs = [graph.subgraph(vertices) for vertices in parts]
+    if len(subgraphs) > 1:
+        cores = max(cpu_count() // len(subgraphs), 1)
+        with ProcessPoolExecutor(min(len(subgraphs), cpu_count())) as executor:
+            results = list(executor.map(solve_graph, subgraphs, [cores] * len(subgraphs)))
+    else:
+        results = [solve_graph(subgraph) for subgraph in subgraphs]
+    for vertices, (part_colors, part_bound) in zip(parts, results):
+        colors[vertices] = part_colors
+        lower_bound = max(lower_bound, part_bound)
+    colors = colors.tolist()
 
     max_color = max(colors) + 1
-    output_data = f"{max_color} {0}\n"
+    opt = int(max_color == lower_bound)
+    output_data = f"{max_color} {opt}\n"
     output_data += ' '.join(map(str, colors))
 
     return output_data
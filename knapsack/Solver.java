@@ -13,6 +13,12 @@ public class Solver {
      */
     public static void main(String[] args) {
         try {
+            for(String arg : args){
+                if(arg.equals("-worker")){
+                    serve(System.in, System.out);
+                    return;
+                }
+            }
             solve(args);
         } catch (IOException e) {
             e.printStackTrace();
@@ -48,7 +54,46 @@ public class Solver {
             input.close();
         }
         
-        
+        System.out.print(solve(lines));
+    }
+
+    /**
+     * Keep the JVM alive and solve every instance sent on the input stream.
+     * Each instance is framed as a 4-byte big-endian length followed by the UTF-8 text
+     * of the instance, and each solution is written back with the same framing.
+     * The worker stops when the input stream is closed.
+     */
+    public static void serve(InputStream in, OutputStream out) throws IOException {
+        DataInputStream input = new DataInputStream(new BufferedInputStream(in));
+        DataOutputStream output = new DataOutputStream(new BufferedOutputStream(out));
+
+        while(true){
+            int length;
+            try {
+                length = input.readInt();
+            } catch (EOFException e) {
+                return;
+            }
+            byte[] payload = new byte[length];
+            input.readFully(payload);
+
+            List<String> lines = new ArrayList<String>();
+            for(String line : new String(payload, "UTF-8").split("\\r?\\n")){
+                lines.add(line);
+            }
+
+            byte[] solution = solve(lines).getBytes("UTF-8");
+            output.writeInt(solution.length);
+            output.write(solution);
+            output.flush();
+        }
+    }
+
+    /**
+     * Solve the instance given by the lines of its input file and return the solution
+     * in the specified output format
+     */
+    public static String solve(List<String> lines) {
         // parse the data in the file
         String[] firstLine = lines.get(0).split("\\s+");
         int items = Integer.parseInt(firstLine[0]);
@@ -82,10 +127,12 @@ public class Solver {
         }
         
         // prepare the solution in the specified output format
-        System.out.println(value+" 0");
+        StringBuilder output = new StringBuilder();
+        output.append(value+" 0\n");
         for(int i=0; i < items; i++){
-            System.out.print(taken[i]+" ");
+            output.append(taken[i]+" ");
         }
-        System.out.println("");        
+        output.append("\n");
+        return output.toString();
     }
-}
\ No newline at end of file
+}
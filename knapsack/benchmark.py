@@ -0,0 +1,176 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import csv
+import json
+import os
+import resource
+from multiprocessing import Process, Queue
+from time import time
+
+from solver import (parse, greedy, dp_numpy, dp_hirschberg, branch_and_bound, core, pareto,
+                    is_subset_sum, subset_sum, mip, work, COST_MODEL, SUBSET_SUM_MAX_BITS)
+
+
+def run_greedy(capacity, items):
+    return greedy(capacity, items)
+
+def run_dp(capacity, items):
+    return dp_numpy(capacity, items)
+
+def run_hirschberg(capacity, items):
+    return dp_hirschberg(capacity, items)
+
+def run_bnb(capacity, items):
+    value, _, taken = branch_and_bound(capacity, items)
+    return value, taken
+
+def run_core(capacity, items):
+    value, _, taken = core(capacity, items)
+    return value, taken
+
+def run_pareto(capacity, items):
+    value, _, taken = pareto(capacity, items)
+    return value, taken
+
+def run_subset_sum(capacity, items):
+    if not is_subset_sum(items) or capacity > SUBSET_SUM_MAX_BITS:
+        return None
+    return subset_sum(capacity, items)
+
+def run_mip(capacity, items):
+    value, _, taken = mip(capacity, items, mip_gap=0)
+    return value, taken
+
+ENGINES = {
+    'greedy': run_greedy,
+    'dp': run_dp,
+    'hirschberg': run_hirschberg,
+    'bnb': run_bnb,
+    'core': run_core,
+    'pareto': run_pareto,
+    'subset_sum': run_subset_sum,
+    'mip': run_mip,
+}
+
+
+def measure(engine, input_data, queue):
+    capacity, items = parse(input_data)
+    start = time()
+    result = ENGINES[engine](capacity, items)
+    elapsed = time() - start
+    if result is None:
+        queue.put(None)
+        return
+    value, taken = result
+    weight = sum(item.weight for item in items if taken[item.index])
+    # ru_maxrss is in kilobytes on Linux
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, value, weight <= capacity))
+
+
+def run(engine, file_location, timeout):
+    with open(file_location, 'r') as input_data_file:
+        input_data = input_data_file.read()
+    capacity, items = parse(input_data)
+    record = {'instance': os.path.basename(file_location), 'engine': engine, 'n': len(items),
+              'capacity': capacity, 'cells': len(items) * (capacity + 1),
+              'status': 'ok', 'time': None, 'peak_rss_mb': None, 'value': None, 'gap': None}
+
+    # every run gets its own process so that a timeout can kill it and memory is not shared
+    queue = Queue()
+    process = Process(target=measure, args=(engine, input_data, queue))
+    process.start()
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        record['status'] = 'timeout'
+    elif process.exitcode != 0:
+        record['status'] = 'error'
+    else:
+        result = queue.get()
+        if result is None:
+            record['status'] = 'skipped'
+            return record
+        elapsed, peak, value, feasible = result
+        record.update(time=elapsed, peak_rss_mb=peak, value=value)
+        if not feasible:
+            record['status'] = 'infeasible'
+    return record
+
+
+def benchmark(file_locations, engines, timeout):
+    records = []
+    for file_location in file_locations:
+        runs = [run(engine, file_location, timeout) for engine in engines]
+        solved = [r['value'] for r in runs if r['status'] == 'ok']
+        best = max(solved) if solved else None
+        for r in runs:
+            if r['status'] == 'ok' and best:
+                r['gap'] = (best - r['value']) / best
+            print(r['instance'], r['engine'], r['status'], r['time'], r['value'], flush=True)
+        records.extend(runs)
+    return records
+
+
+def crossovers(records):
+    # for each instance, the fastest engine among those that reached the best known value,
+    # in order of DP table size; the size where the winner changes is where solve_it should switch
+    lines = []
+    instances = sorted({r['instance'] for r in records}, key=lambda name: next(r['cells'] for r in records if r['instance'] == name))
+    winner = None
+    for name in instances:
+        exact = [r for r in records if r['instance'] == name and r['status'] == 'ok' and r['gap'] == 0]
+        if not exact:
+            continue
+        fastest = min(exact, key=lambda r: r['time'])
+        line = f"{name:>16} cells={fastest['cells']:>14} fastest={fastest['engine']:<10} {fastest['time']:.3f}s"
+        if winner is not None and fastest['engine'] != winner:
+            line += f"  <- crossover from {winner}"
+        winner = fastest['engine']
+        lines.append(line)
+    return lines
+
+
+def calibrate(records):
+    # seconds per unit of work for each engine in the solver's cost model, from its exact runs
+    cost_model = {}
+    for engine in COST_MODEL:
+        rates = sorted(r['time'] / work(engine, r['n'], r['capacity']) for r in records
+                       if r['engine'] == engine and r['status'] == 'ok' and r['gap'] == 0 and r['time'] > 0.01)
+        if rates:
+            cost_model[engine] = rates[len(rates) // 2]
+    return cost_model
+
+
+def save(records, json_location=None, csv_location=None):
+    if json_location:
+        with open(json_location, 'w') as json_file:
+            json.dump(records, json_file, indent=2)
+    if csv_location:
+        with open(csv_location, 'w', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=list(records[0].keys()))
+            writer.writeheader()
+            writer.writerows(records)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark the knapsack engines on the instances in the data directory.')
+    parser.add_argument('files', nargs='*', help='instances to run (default: every file in ./data)')
+    parser.add_argument('--engines', nargs='+', default=['greedy', 'dp', 'mip'], choices=sorted(ENGINES))
+    parser.add_argument('--timeout', type=float, default=60, help='seconds per engine and instance')
+    parser.add_argument('--json', default='benchmark.json')
+    parser.add_argument('--csv', default='benchmark.csv')
+    parser.add_argument('--cost-model', help='write the fitted cost model here, for KNAPSACK_COST_MODEL')
+    args = parser.parse_args()
+
+    files = args.files or sorted(os.path.join('data', name) for name in os.listdir('data'))
+    records = benchmark(files, args.engines, args.timeout)
+    save(records, args.json, args.csv)
+    print('\n'.join(crossovers(records)))
+    if args.cost_model:
+        cost_model = calibrate(records)
+        with open(args.cost_model, 'w') as cost_model_file:
+            json.dump(cost_model, cost_model_file, indent=2)
+        print(cost_model)
@@ -1,12 +1,51 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import json
+import os
+from bisect import bisect_right
 from collections import namedtuple
+from functools import reduce
+from math import gcd, log2
+from multiprocessing import Barrier, Process
+from multiprocessing.shared_memory import SharedMemory
 from operator import attrgetter
+from tempfile import mkstemp
+from time import time
 
+import numpy as np
 from psutil import cpu_count
 from gurobipy import *
 Item = namedtuple("Item", ['index', 'value', 'weight', 'density'])
+Reduction = namedtuple("Reduction", ['capacity', 'items', 'value', 'taken', 'index'])
+Features = namedtuple("Features", ['n', 'capacity', 'cells', 'correlation', 'gcd', 'lp_gap', 'uniform_density'])
+
+# about 500 MB of packed decision bits
+DP_MAX_CELLS = 4 * 10**9
+# the value row, its candidate copy and the take mask cost about 25 bytes per capacity unit,
+# whatever the number of items
+DP_MAX_CAPACITY = 5 * 10**7
+# branch and bound proves small instances whatever their capacity
+BNB_MAX_ITEMS = 30
+# above the bit budget, the divide-and-conquer DP trades twice the time for O(C) memory
+HIRSCHBERG_MAX_CELLS = 10**10
+# below this, process start-up and the per-item barrier outweigh the split rows
+PARALLEL_MIN_CAPACITY = 10**6
+# when set, DP decision bits above DP_MAX_CELLS go to a file here instead of the divide-and-conquer DP
+SCRATCH_DIR = os.environ.get('KNAPSACK_SCRATCH_DIR')
+# a core DP above this size is slower than branch and bound in practice
+CORE_DP_CELLS = 10**8
+PARETO_MAX_STATES = 10**6
+# the subset-sum bitsets are Python integers of C + 1 bits, and a few are alive at once
+SUBSET_SUM_MAX_BITS = 10**9
+# seconds per unit of work(), fitted on the data directory by `benchmark.py --cost-model`
+COST_MODEL = {'subset_sum': 9.2e-11, 'dp': 3.3e-9, 'hirschberg': 1.45e-9, 'bnb': 1.4e-8, 'core': 4.5e-9}
+if os.environ.get('KNAPSACK_COST_MODEL'):
+    with open(os.environ['KNAPSACK_COST_MODEL']) as cost_model_file:
+        COST_MODEL.update(json.load(cost_model_file))
+# the core proof is expected to go through on weakly correlated or tightly bounded instances
+CORE_MAX_CORRELATION = 0.9
+CORE_MAX_GAP = 0.01
 
 
 def greedy(capacity, items):
@@ -42,10 +81,557 @@ def dp(capacity, items):
     
     return value, taken
 
-def mip(cap, items, verbose=False, num_threads=None):
+def dp_table(capacity, items, path=None):
+    n = len(items)
+    row = np.zeros(capacity + 1, dtype=np.int64)
+    if path and n:
+        # rows are written once each, in order, so the page cache streams them to disk
+        bits = np.memmap(path, dtype=np.uint8, mode='w+', shape=(n, (capacity + 8) // 8))
+    else:
+        bits = np.zeros((n, (capacity + 8) // 8), dtype=np.uint8)
+    take = np.zeros(capacity + 1, dtype=bool)
+    for i in range(n):
+        v_i = items[i].value
+        w_i = items[i].weight
+        if w_i > capacity:
+            continue
+        candidate = row[:capacity + 1 - w_i] + v_i
+        take[:w_i] = False
+        np.greater(candidate, row[w_i:], out=take[w_i:])
+        np.maximum(row[w_i:], candidate, out=row[w_i:])
+        bits[i] = np.packbits(take, bitorder='little')
+    return row, bits
+
+def dp_traceback(items, bits, k):
+    taken = [0] * len(items)
+    for i in reversed(range(len(items))):
+        if bits[i, k >> 3] >> (k & 7) & 1:
+            taken[i] = 1
+            k -= items[i].weight
+    return taken
+
+def dp_numpy(capacity, items, scratch_dir=None):
+    if scratch_dir is None:
+        row, bits = dp_table(capacity, items)
+        return int(row[capacity]), dp_traceback(items, bits, capacity)
+
+    fd, path = mkstemp(suffix='.bits', dir=scratch_dir)
+    os.close(fd)
+    try:
+        row, bits = dp_table(capacity, items, path)
+        # the traceback reads one byte per row, from the last row to the first
+        value, taken = int(row[capacity]), dp_traceback(items, bits, capacity)
+        del bits
+    finally:
+        os.remove(path)
+
+    return value, taken
+
+def dp_block(rows_name, bits_name, capacity, weights, values, lo, hi, barrier):
+    rows_shm = SharedMemory(name=rows_name)
+    bits_shm = SharedMemory(name=bits_name)
+    n = len(weights)
+    rows = np.ndarray((2, capacity + 1), dtype=np.int64, buffer=rows_shm.buf)
+    bits = np.ndarray((n, (capacity + 8) // 8), dtype=np.uint8, buffer=bits_shm.buf)
+    take = np.zeros(hi - lo, dtype=bool)
+    for i in range(n):
+        # rows alternate between items; every block reads all of prev but only writes its own slice of cur
+        prev, cur = rows[i % 2], rows[(i + 1) % 2]
+        w_i = weights[i]
+        start = max(lo, w_i)
+        cur[lo:min(start, hi)] = prev[lo:min(start, hi)]
+        if start < hi:
+            candidate = prev[start - w_i:hi - w_i] + values[i]
+            take[:start - lo] = False
+            np.greater(candidate, prev[start:hi], out=take[start - lo:])
+            np.maximum(prev[start:hi], candidate, out=cur[start:hi])
+            bits[i, lo >> 3:(hi + 7) >> 3] = np.packbits(take, bitorder='little')
+        barrier.wait()
+    rows = bits = prev = cur = None
+    rows_shm.close()
+    bits_shm.close()
+
+def dp_parallel(capacity, items, processes=None):
+    n = len(items)
+    stride = (capacity + 8) // 8
+    # blocks are byte aligned so that no two processes write the same byte of bits
+    step = 8 * -(-stride // (processes or cpu_count()))
+    blocks = [(lo, min(lo + step, capacity + 1)) for lo in range(0, capacity + 1, step)]
+
+    rows_shm = SharedMemory(create=True, size=16 * (capacity + 1))
+    bits_shm = SharedMemory(create=True, size=max(1, n * stride))
+    try:
+        rows = np.ndarray((2, capacity + 1), dtype=np.int64, buffer=rows_shm.buf)
+        bits = np.ndarray((n, stride), dtype=np.uint8, buffer=bits_shm.buf)
+        rows[:] = 0
+        bits[:] = 0
+        barrier = Barrier(len(blocks))
+        weights = [item.weight for item in items]
+        values = [item.value for item in items]
+        workers = [Process(target=dp_block, args=(rows_shm.name, bits_shm.name, capacity, weights, values, lo, hi, barrier))
+                   for lo, hi in blocks]
+        for worker in workers:
+            worker.start()
+        # a dead worker would leave the others waiting on the barrier forever
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(0.1)
+                if worker.exitcode:
+                    barrier.abort()
+        if any(worker.exitcode for worker in workers):
+            raise RuntimeError("a DP worker process failed")
+
+        value = int(rows[n % 2, capacity])
+        taken = dp_traceback(items, bits, capacity)
+        del rows, bits
+    finally:
+        rows_shm.close()
+        rows_shm.unlink()
+        bits_shm.close()
+        bits_shm.unlink()
+
+    return value, taken
+
+def dp_row(capacity, items):
+    row = np.zeros(capacity + 1, dtype=np.int64)
+    for item in items:
+        w_i = item.weight
+        if w_i <= capacity:
+            np.maximum(row[w_i:], row[:capacity + 1 - w_i] + item.value, out=row[w_i:])
+    return row
+
+def dp_hirschberg(capacity, items, leaf_size=64):
+    taken = [0] * len(items)
+
+    # split the capacity between both halves of items[lo:hi] with a forward and a
+    # backward value row, so only O(C) values are alive per level
+    def solve(lo, hi, capacity):
+        if hi - lo <= leaf_size:
+            # leaf_size bits per capacity unit weigh as much as one int64 row
+            _, part = dp_numpy(capacity, items[lo:hi])
+            taken[lo:hi] = part
+            return
+        mid = (lo + hi) // 2
+        left = dp_row(capacity, items[lo:mid])
+        right = dp_row(capacity, items[mid:hi])
+        c = int(np.argmax(left + right[::-1]))
+        del left, right
+        solve(lo, mid, c)
+        solve(mid, hi, capacity - c)
+
+    solve(0, len(items), capacity)
+    value = sum(item.value for item, t in zip(items, taken) if t)
+
+    return value, taken
+
+def is_subset_sum(items):
+    # every item has the same density, so maximizing value is maximizing weight
+    return all(item.value * items[0].weight == item.weight * items[0].value for item in items)
+
+def reachable(capacity, items):
+    # bit k is set when some subset of the items weighs exactly k
+    mask = (1 << (capacity + 1)) - 1
+    reach = 1
+    for item in items:
+        reach |= (reach << item.weight) & mask
+    return reach
+
+# REVERSED_BITS[b] is the byte b with its bit order reversed
+REVERSED_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder='little')
+REVERSED_BITS = np.packbits(REVERSED_BITS, axis=1).ravel()
+
+def reverse_bits(bitset, size):
+    # bit k of the result is bit size - k of bitset, for 0 <= k <= size
+    nbytes = (size + 8) // 8
+    packed = np.frombuffer(bitset.to_bytes(nbytes, 'little'), dtype=np.uint8)
+    reversed_bitset = int.from_bytes(REVERSED_BITS[packed[::-1]].tobytes(), 'little')
+    return reversed_bitset >> (8 * nbytes - 1 - size)
+
+def subset_sum(capacity, items):
+    n = len(items)
+    reach = reachable(capacity, items)
+    best = reach.bit_length() - 1
+    del reach
+    taken = [0] * n
+
+    # items lo..hi-1 weigh exactly target: split the target between both halves with one
+    # reachable set per half, freed before recursing, so a few C-bit integers are alive at once
+    def trace(lo, hi, target):
+        if target == 0:
+            return
+        if hi - lo == 1:
+            taken[lo] = 1
+            return
+        mid = (lo + hi) // 2
+        left = reachable(target, items[lo:mid])
+        right = reverse_bits(reachable(target, items[mid:hi]), target)
+        # bit a of both is set when the left half reaches a and the right half target - a
+        both = left & right
+        del left, right
+        a = (both & -both).bit_length() - 1
+        del both
+        trace(lo, mid, a)
+        trace(mid, hi, target - a)
+
+    trace(0, n, best)
+    value = sum(item.value for item, t in zip(items, taken) if t)
+
+    return value, taken
+
+def prefix_sums(order):
+    prefix_w = [0] * (len(order) + 1)
+    prefix_v = [0] * (len(order) + 1)
+    for j, item in enumerate(order):
+        prefix_w[j+1] = prefix_w[j] + item.weight
+        prefix_v[j+1] = prefix_v[j] + item.value
+    return prefix_w, prefix_v
+
+def lp_bound_without(order, prefix_w, prefix_v, k, capacity):
+    # Dantzig bound over the density-sorted items except order[k]
+    j = bisect_right(prefix_w, capacity) - 1
+    if j < k:
+        return prefix_v[j] + (capacity - prefix_w[j]) * order[j].value // order[j].weight
+    w_k = order[k].weight
+    j = bisect_right(prefix_w, capacity + w_k) - 1
+    bound = prefix_v[j] - order[k].value
+    if j < len(order):
+        bound += (capacity + w_k - prefix_w[j]) * order[j].value // order[j].weight
+    return bound
+
+def branch_and_bound(capacity, items, time_limit=None, callback=None):
+    order = sorted(items, key=attrgetter('density'), reverse=True)
+    n = len(order)
+    weights = [item.weight for item in order]
+    values = [item.value for item in order]
+    prefix_w, prefix_v = prefix_sums(order)
+
+    def solution(node):
+        chain, i, j = node
+        positions = list(range(i, j))
+        while chain is not None:
+            positions.append(chain[0])
+            chain = chain[1]
+        taken = [0] * len(items)
+        for p in positions:
+            taken[order[p].index] = 1
+        return taken
+
+    start = time()
+    best, best_node = -1, None
+    opt = 1
+    # each entry is (next item, weight, value, linked list of taken positions)
+    stack = [(0, 0, 0, None)]
+    steps = 0
+    while stack:
+        i, weight, value, chain = stack.pop()
+        while True:
+            steps += 1
+            if time_limit and steps & 1023 == 0 and time() - start > time_limit:
+                opt = 0
+                stack = []
+                break
+            # Dantzig bound: items i..j-1 fit entirely, item j is taken fractionally
+            target = prefix_w[i] + capacity - weight
+            j = bisect_right(prefix_w, target, i) - 1
+            greedy_value = value + prefix_v[j] - prefix_v[i]
+            if greedy_value > best:
+                best, best_node = greedy_value, (chain, i, j)
+                if callback:
+                    callback(best, solution(best_node))
+            if j == n or greedy_value + (target - prefix_w[j]) * values[j] // weights[j] <= best:
+                break
+            if weight + weights[i] <= capacity:
+                stack.append((i + 1, weight, value, chain))
+                weight += weights[i]
+                value += values[i]
+                chain = (i, chain)
+            i += 1
+
+    return best, opt, solution(best_node)
+
+def core(capacity, items, time_limit=None, core_size=25):
+    order = sorted(items, key=attrgetter('density'), reverse=True)
+    n = len(order)
+    prefix_w, prefix_v = prefix_sums(order)
+    taken = [0] * len(items)
+    b = bisect_right(prefix_w, capacity) - 1
+    if b == n:
+        for item in order:
+            taken[item.index] = 1
+        return prefix_v[n], 1, taken
+
+    # bound of the best solution that disagrees with the greedy choice on order[p]
+    flipped = []
+    for p, item in enumerate(order):
+        if p < b:
+            flipped.append(lp_bound_without(order, prefix_w, prefix_v, p, capacity))
+        elif item.weight <= capacity:
+            flipped.append(item.value + lp_bound_without(order, prefix_w, prefix_v, p, capacity - item.weight))
+        else:
+            flipped.append(-1)
+
+    start = time()
+    lo, hi = max(0, b - core_size), min(n, b + core_size)
+    best = None
+    while True:
+        room = capacity - prefix_w[lo]
+        core_items = [Item(q, item.value, item.weight, item.density) for q, item in enumerate(order[lo:hi])]
+        if len(core_items) * (room + 1) <= CORE_DP_CELLS:
+            core_value, core_taken = dp_numpy(room, core_items)
+            core_opt = 1
+        else:
+            core_value, core_opt, core_taken = pareto(room, core_items, max_states=PARETO_MAX_STATES)
+            if not core_opt:
+                remaining = time_limit - (time() - start) if time_limit else None
+                bnb_value, core_opt, bnb_taken = branch_and_bound(room, core_items, time_limit=remaining)
+                if bnb_value > core_value:
+                    core_value, core_taken = bnb_value, bnb_taken
+        if best is None or prefix_v[lo] + core_value > best[0]:
+            best = (prefix_v[lo] + core_value, lo, hi, core_taken)
+
+        # outside the core every item keeps its greedy choice, which is optimal
+        # once no item with a flipped choice can beat the incumbent
+        free = [p for p in range(n) if (p < lo or p >= hi) and flipped[p] > best[0]]
+        opt = 0 if free else core_opt
+        if opt or (lo == 0 and hi == n) or (time_limit and time() - start > time_limit):
+            break
+        core_size *= 2
+        lo = min([max(0, b - core_size)] + free)
+        hi = max([min(n, b + core_size)] + [p + 1 for p in free])
+
+    value, lo, hi, core_taken = best
+    for p in range(lo):
+        taken[order[p].index] = 1
+    for q in range(hi - lo):
+        if core_taken[q]:
+            taken[order[lo + q].index] = 1
+
+    return value, opt, taken
+
+def pareto_frontier(capacity, items, prune=True, max_states=None):
+    order = sorted(items, key=attrgetter('density'), reverse=True)
+    n = len(order)
+    prefix_w, prefix_v = map(np.array, prefix_sums(order))
+    # padded so that a break index of n adds no fractional part
+    item_w = np.array([item.weight for item in order] + [1])
+    item_v = np.array([item.value for item in order] + [0])
+
+    incumbent, opt = 0, 1
+    weights = np.zeros(1, dtype=np.int64)
+    values = np.zeros(1, dtype=np.int64)
+    parents, took = [], []
+    for i, item in enumerate(order):
+        fits = np.flatnonzero(weights <= capacity - item.weight)
+        all_w = np.concatenate((weights, weights[fits] + item.weight))
+        all_v = np.concatenate((values, values[fits] + item.value))
+        parent = np.concatenate((np.arange(len(weights)), fits))
+        flag = np.concatenate((np.zeros(len(weights), dtype=bool), np.ones(len(fits), dtype=bool)))
+
+        # both halves are sorted by weight, so the stable sort is a merge
+        merged = np.argsort(all_w, kind='stable')
+        all_w, all_v, parent, flag = all_w[merged], all_v[merged], parent[merged], flag[merged]
+        keep = np.empty(len(all_v), dtype=bool)
+        keep[0] = True
+        keep[1:] = all_v[1:] > np.maximum.accumulate(all_v)[:-1]
+        # of two kept states with the same weight, the later one has the higher value
+        keep[:-1] &= (all_w[:-1] != all_w[1:]) | ~keep[1:]
+
+        if prune or max_states:
+            target = prefix_w[i+1] + capacity - all_w
+            j = np.searchsorted(prefix_w, target, side='right') - 1
+            completion = all_v + prefix_v[j] - prefix_v[i+1]
+            bound = completion + (target - prefix_w[j]) * item_v[j] // item_w[j]
+        if prune and opt:
+            incumbent = max(incumbent, int(completion[keep].max()))
+            keep &= bound >= incumbent
+        if max_states and np.count_nonzero(keep) > max_states:
+            # beam: keep the states with the best bounds, the result is no longer
+            # exact and the incumbent may be cut off, so stop pruning against it
+            opt = 0
+            kept = np.flatnonzero(keep)
+            best = np.argpartition(-bound[kept], max_states)[:max_states]
+            keep[:] = False
+            keep[kept[best]] = True
+
+        weights, values = all_w[keep], all_v[keep]
+        parents.append(parent[keep])
+        took.append(flag[keep])
+
+    return order, weights, values, parents, took, opt
+
+def pareto_traceback(order, parents, took, state):
+    taken = [0] * len(order)
+    for i in reversed(range(len(order))):
+        if took[i][state]:
+            taken[order[i].index] = 1
+        state = parents[i][state]
+    return taken
+
+def pareto(capacity, items, prune=True, max_states=None):
+    order, weights, values, parents, took, opt = pareto_frontier(capacity, items, prune, max_states)
+    state = int(np.argmax(values))
+    return int(values[state]), opt, pareto_traceback(order, parents, took, state)
+
+def solve_capacities(items, capacities):
+    capacities = list(capacities)
+    if not capacities:
+        return
+    top = max(capacities)
+    if len(items) * (top + 1) <= DP_MAX_CELLS:
+        row, bits = dp_table(top, items)
+        for capacity in capacities:
+            yield capacity, int(row[capacity]), dp_traceback(items, bits, capacity)
+    else:
+        # without pruning the frontier is exact for every capacity up to top,
+        # and values grow with weight, so the best state is the heaviest that fits
+        order, weights, values, parents, took, _ = pareto_frontier(top, items, prune=False)
+        for capacity in capacities:
+            state = int(np.searchsorted(weights, capacity, side='right')) - 1
+            yield capacity, int(values[state]), pareto_traceback(order, parents, took, state)
+
+def reduce_items(capacity, items):
+    taken = [0] * len(items)
+    order = sorted((item for item in items if item.weight <= capacity), key=attrgetter('density'), reverse=True)
+    prefix_w, prefix_v = prefix_sums(order)
+    incumbent, weight = 0, 0
+    for item in order:
+        if weight + item.weight <= capacity:
+            weight += item.weight
+            incumbent += item.value
+
+    # strict tests keep the greedy incumbent, and so every optimal solution,
+    # consistent with all the fixings
+    room, value, free = capacity, 0, []
+    for p, item in enumerate(order):
+        if item.value + lp_bound_without(order, prefix_w, prefix_v, p, capacity - item.weight) < incumbent:
+            continue
+        if lp_bound_without(order, prefix_w, prefix_v, p, capacity) < incumbent:
+            taken[item.index] = 1
+            room -= item.weight
+            value += item.value
+        else:
+            free.append(item)
+
+    free = [item for item in free if item.weight <= room]
+    g = reduce(gcd, (item.weight for item in free), 0) or 1
+    reduced = []
+    for q, item in enumerate(free):
+        w = item.weight // g
+        reduced.append(Item(q, item.value, w, 1.0 * item.value / w))
+
+    return Reduction(room // g, reduced, value, taken, [item.index for item in free])
+
+def expand_taken(reduction, taken):
+    full = list(reduction.taken)
+    for q, t in enumerate(taken):
+        if t:
+            full[reduction.index[q]] = 1
+    return full
+
+def local_search(capacity, items, taken, time_limit=1, window=200, pair_window=60):
+    start = time()
+    order = sorted(items, key=attrgetter('density'), reverse=True)
+    weights = np.array([item.weight for item in order], dtype=np.int64)
+    values = np.array([item.value for item in order], dtype=np.int64)
+    x = np.array([taken[item.index] for item in order], dtype=bool)
+    room = capacity - int(weights[x].sum())
+
+    # moves only touch the least dense taken and the densest untaken items,
+    # where improvements over a density-ordered solution live
+    while not (time_limit and time() - start > time_limit):
+        inside = np.flatnonzero(x)[::-1][:window]
+        outside = np.flatnonzero(~x)[:window]
+        moves = []
+
+        # add one item
+        fits = outside[weights[outside] <= room]
+        if len(fits):
+            b = fits[np.argmax(values[fits])]
+            moves.append((values[b], [], [b]))
+
+        # 1-1: drop a, add b
+        if len(inside) and len(outside):
+            gain = values[outside][None, :] - values[inside][:, None]
+            gain[weights[outside][None, :] - weights[inside][:, None] > room] = 0
+            a, b = np.unravel_index(np.argmax(gain), gain.shape)
+            moves.append((gain[a, b], [inside[a]], [outside[b]]))
+
+        # 1-2: drop a, add the pair b, c
+        near = outside[:pair_window]
+        if len(inside) and len(near) > 1:
+            p, q = np.triu_indices(len(near), 1)
+            gain = values[near[p]] + values[near[q]] - values[inside][:, None]
+            gain[weights[near[p]] + weights[near[q]] - weights[inside][:, None] > room] = 0
+            a, k = np.unravel_index(np.argmax(gain), gain.shape)
+            moves.append((gain[a, k], [inside[a]], [near[p[k]], near[q[k]]]))
+
+        # 2-1: drop the pair a, b, add c
+        near = inside[:pair_window]
+        if len(near) > 1 and len(outside):
+            p, q = np.triu_indices(len(near), 1)
+            gain = values[outside][None, :] - (values[near[p]] + values[near[q]])[:, None]
+            gain[weights[outside][None, :] - (weights[near[p]] + weights[near[q]])[:, None] > room] = 0
+            k, c = np.unravel_index(np.argmax(gain), gain.shape)
+            moves.append((gain[k, c], [near[p[k]], near[q[k]]], [outside[c]]))
+
+        gain, drop, add = max(moves, key=lambda move: move[0], default=(0, [], []))
+        if gain <= 0:
+            break
+        x[drop] = False
+        x[add] = True
+        room += int(weights[drop].sum()) - int(weights[add].sum())
+
+    taken = [0] * len(items)
+    for p in np.flatnonzero(x):
+        taken[order[p].index] = 1
+
+    return int(values[x].sum()), taken
+
+def anytime(capacity, items, time_limit=60, callback=None):
+    start = time()
+    order = sorted(items, key=attrgetter('density'), reverse=True)
+    prefix_w, prefix_v = prefix_sums(order)
+    b = bisect_right(prefix_w, capacity) - 1
+    bound = prefix_v[b]
+    if b < len(order):
+        bound += (capacity - prefix_w[b]) * order[b].value // order[b].weight
+    best = [-1, None, bound]
+
+    # records a solution or a proven bound, streams it, and tells whether the gap is closed
+    def report(value, taken, proven=None):
+        improved = value > best[0]
+        if improved:
+            best[0], best[1] = value, taken
+        if proven is not None and proven < best[2]:
+            best[2] = proven
+            improved = True
+        if improved and callback:
+            callback(best[0], best[2], best[1])
+        return best[0] >= best[2]
+
+    def remaining():
+        return time_limit - (time() - start)
+
+    closed = report(*greedy(capacity, items))
+    if not closed and remaining() > 0:
+        closed = report(*local_search(capacity, items, best[1], time_limit=remaining()))
+    if not closed and remaining() > 0:
+        # leave the second half of the budget to the MIP
+        value, opt, taken = branch_and_bound(capacity, items, time_limit=remaining() / 2, callback=report)
+        closed = report(value, taken, value if opt else None)
+    if not closed and remaining() > 0:
+        try:
+            value, opt, taken = mip(capacity, items, time_limit=remaining(), mip_gap=0, start=best[1])
+            closed = report(value, taken, value if opt else None)
+        except GurobiError:
+            pass
+
+    return best[0], int(closed), best[1]
+
+def mip(cap, items, verbose=False, num_threads=None, time_limit=None, mip_gap=None, start=None):
     item_count = len(items)
-    values = [item.value for item in items]
-    weights = [item.weight for item in items]
+    values = np.array([item.value for item in items])
+    weights = np.array([item.weight for item in items])
 
     m = Model("knapsack")
     m.setParam('OutputFlag', verbose)
@@ -54,19 +640,92 @@ def mip(cap, items, verbose=False, num_threads=None):
     else:
         m.setParam("Threads", cpu_count())
 
-    x = m.addVars(item_count, vtype=GRB.BINARY, name="items")
-    m.setObjective(LinExpr(values, [x[i] for i in range(item_count)]), GRB.MAXIMIZE)
-    m.addLConstr(LinExpr(weights, [x[i] for i in range(item_count)]), GRB.LESS_EQUAL, cap, name="capacity")
+    if time_limit:
+        m.setParam("TimeLimit", time_limit)
+    if mip_gap is not None:
+        m.setParam("MIPGap", mip_gap)
+
+    x = m.addMVar(item_count, vtype=GRB.BINARY, name="items")
+    m.setObjective(values @ x, GRB.MAXIMIZE)
+    m.addConstr(weights @ x <= cap, name="capacity")
+
+    # without a start Gurobi spends its first seconds rediscovering the greedy solution
+    if start is None:
+        start = greedy(cap, items)[1]
+    x.Start = np.array(start)
 
     m.update()
     m.optimize()
 
-    opt = 1 if m.status == 2 else 0
+    # with large coefficients the integrality tolerance lets objVal drift from
+    # the rounded selection, so the value is recomputed from it
+    taken = np.rint(x.X).astype(np.int64)
+    value = int(values @ taken)
 
-    return int(m.objVal), opt, [int(var.x) for var in m.getVars()]
+    # OPTIMAL only means within MIPGap; the values are integral, so compare the rounded-down bound
+    opt = 1 if m.status == 2 and int(m.objBound + 1e-6) <= value else 0
 
+    return value, opt, taken.tolist()
 
-def solve_it(input_data):
+
+def features(capacity, items):
+    n = len(items)
+    weights = np.array([item.weight for item in items], dtype=float)
+    values = np.array([item.value for item in items], dtype=float)
+    correlation = 0.0
+    if n > 1 and weights.std() > 0 and values.std() > 0:
+        correlation = float(np.corrcoef(weights, values)[0, 1])
+
+    order = sorted(items, key=attrgetter('density'), reverse=True)
+    prefix_w, prefix_v = prefix_sums(order)
+    b = bisect_right(prefix_w, capacity) - 1
+    bound = prefix_v[b]
+    if b < n:
+        bound += (capacity - prefix_w[b]) * order[b].value // order[b].weight
+    value, _ = greedy(capacity, items)
+    lp_gap = (bound - value) / bound if bound else 0.0
+
+    return Features(n, capacity, n * (capacity + 1), correlation, reduce(gcd, (item.weight for item in items), 0),
+                    lp_gap, is_subset_sum(items))
+
+def work(engine, n, capacity):
+    cells = n * (capacity + 1)
+    if engine == 'subset_sum':
+        return cells * log2(n + 1)
+    if engine == 'dp':
+        return cells
+    if engine == 'bnb':
+        # the worst case explores the whole tree
+        return 2 ** n
+    if engine == 'hirschberg':
+        # every level of the recursion runs a forward and a backward pass over half the items,
+        # which adds up to about twice the table
+        return 2 * cells
+    # core: sorting and bounds, then a DP over a window of about 2 * core_size items
+    return n * log2(n + 1) + min(cells, 50 * (capacity + 1), CORE_DP_CELLS)
+
+def select_engine(f, cost_model=COST_MODEL):
+    exact = []
+    if f.uniform_density and f.capacity <= SUBSET_SUM_MAX_BITS:
+        exact.append('subset_sum')
+    # the divide-and-conquer DP only pays off once the decision bits no longer fit; both DPs
+    # keep whole rows, so neither applies to a very large capacity
+    if f.capacity <= DP_MAX_CAPACITY:
+        if f.cells <= DP_MAX_CELLS:
+            exact.append('dp')
+        elif f.cells <= HIRSCHBERG_MAX_CELLS:
+            exact.append('hirschberg')
+    if f.n <= BNB_MAX_ITEMS:
+        exact.append('bnb')
+    # with a single density the bounds cannot tell items apart, so the core proof fails
+    if not f.uniform_density and (f.correlation < CORE_MAX_CORRELATION or f.lp_gap < CORE_MAX_GAP):
+        exact.append('core')
+    if not exact:
+        # nothing is expected to prove optimality in time, core still returns its best solution
+        return 'core'
+    return min(exact, key=lambda engine: cost_model[engine] * work(engine, f.n, f.capacity))
+
+def parse(input_data):
     lines = input_data.split('\n')
 
     firstLine = lines[0].split()
@@ -81,11 +740,40 @@ def solve_it(input_data):
         v, w = int(parts[0]), int(parts[1])
         items.append(Item(i-1, v, w, 1.0 * v / w))
 
-    if (item_count <= 1000) and (capacity < 3000000):
-        obj, taken = dp(capacity, items)
+    return capacity, items
+
+def solve_it(input_data):
+    capacity, items = parse(input_data)
+
+    reduction = reduce_items(capacity, items)
+    capacity, items = reduction.capacity, reduction.items
+
+    engine = select_engine(features(capacity, items))
+    if engine == 'subset_sum':
+        obj, taken = subset_sum(capacity, items)
+        opt = 1
+    elif engine == 'dp':
+        if capacity >= PARALLEL_MIN_CAPACITY and cpu_count() > 1:
+            obj, taken = dp_parallel(capacity, items)
+        else:
+            obj, taken = dp_numpy(capacity, items)
+        opt = 1
+    elif engine == 'hirschberg':
+        if SCRATCH_DIR and len(items) * (capacity + 1) > DP_MAX_CELLS:
+            obj, taken = dp_numpy(capacity, items, scratch_dir=SCRATCH_DIR)
+        else:
+            obj, taken = dp_hirschberg(capacity, items)
+        opt = 1
+    elif engine == 'bnb':
+        obj, opt, taken = branch_and_bound(capacity, items, time_limit=60)
+        if not opt:
+            obj, taken = local_search(capacity, items, taken)
     else:
-        obj, taken = greedy(capacity, items)
-    opt = 0
+        obj, opt, taken = core(capacity, items, time_limit=60)
+        if not opt:
+            obj, taken = local_search(capacity, items, taken)
+    obj += reduction.value
+    taken = expand_taken(reduction, taken)
     output_data = str(obj) + ' ' + str(opt) + '\n'
     output_data += ' '.join(map(str, taken))
     return output_data
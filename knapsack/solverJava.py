@@ -1,27 +1,88 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-import os
+import atexit
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
 from subprocess import Popen, PIPE
 
-def solve_it(input_data):
+from psutil import cpu_count
+
+
+class JavaWorker:
+    # A long-lived `java Solver -worker` process. Instances and solutions are sent
+    # over its stdin/stdout as a 4-byte big-endian length followed by UTF-8 text.
+
+    def __init__(self, command=('java', 'Solver', '-worker')):
+        self.process = Popen(list(command), stdin=PIPE, stdout=PIPE)
+
+    def solve(self, input_data):
+        payload = input_data.encode('utf-8')
+        self.process.stdin.write(struct.pack('>I', len(payload)) + payload)
+        self.process.stdin.flush()
+        size, = struct.unpack('>I', self._read(4))
+        return self._read(size).decode('utf-8').strip()
+
+    def _read(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.process.stdout.read(size - len(data))
+            if not chunk:
+                raise EOFError('the Java worker exited')
+            data += chunk
+        return data
 
-    # Writes the inputData to a temporay file
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
 
-    tmp_file_name = 'tmp.data'
-    tmp_file = open(tmp_file_name, 'w')
-    tmp_file.write(input_data)
-    tmp_file.close()
 
-    # Runs the command: java Solver -file=tmp.data
+class WorkerPool:
+    # Hands out warm workers to concurrent callers, one slot per core by default. Every
+    # slot starts empty (None) and is filled on first use; a worker that fails is dropped
+    # and its slot freed.
 
-    process = Popen(['java', 'Solver', '-file=' + tmp_file_name], stdout=PIPE, universal_newlines=True)
-    (stdout, stderr) = process.communicate()
+    def __init__(self, size=None, command=('java', 'Solver', '-worker')):
+        self.size = size or cpu_count()
+        self.command = command
+        self.idle = Queue()
+        for _ in range(self.size):
+            self.idle.put(None)
 
-    # removes the temporay file
-    os.remove(tmp_file_name)
+    def solve(self, input_data):
+        worker = self.idle.get()
+        try:
+            if worker is None:
+                worker = JavaWorker(self.command)
+            output_data = worker.solve(input_data)
+        except Exception:
+            if worker is not None:
+                worker.process.kill()
+                worker.process.wait()
+            self.idle.put(None)
+            raise
+        self.idle.put(worker)
+        return output_data
 
-    return stdout.strip()
+    def map(self, inputs):
+        with ThreadPoolExecutor(self.size) as executor:
+            return list(executor.map(self.solve, inputs))
+
+    def close(self):
+        # waits for busy workers to come back before stopping them
+        workers = [self.idle.get() for _ in range(self.size)]
+        for worker in workers:
+            if worker is not None:
+                worker.close()
+            self.idle.put(None)
+
+
+pool = WorkerPool()
+atexit.register(pool.close)
+
+def solve_it(input_data):
+    return pool.solve(input_data)
 
 
 import sys